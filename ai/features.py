@@ -0,0 +1,28 @@
+BASE_FEATURES = [
+    "strength_a",
+    "strength_b",
+    "form_a",
+    "form_b",
+    "xg_a",
+    "xg_b",
+    "injuries_a",
+    "injuries_b",
+    "shots_a",
+    "shots_b",
+    "poss_a",
+    "poss_b",
+]
+
+DERIVED_FEATURES = [
+    "strength_diff",
+    "form_diff",
+    "xg_diff",
+    "injuries_diff",
+    "shots_diff",
+    "poss_diff",
+]
+
+FEATURES = BASE_FEATURES + DERIVED_FEATURES
+
+# Outcome labels indexed by their integer code (alphabetical, as sklearn orders them).
+OUTCOMES = ("away_win", "draw", "home_win")
@@ -1,83 +1,97 @@
 from __future__ import annotations
 
-import csv
-from dataclasses import dataclass, field
+import hashlib
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Optional, Tuple
 
+import numpy as np
+import orjson
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
 COMPETITIONS_URL = "https://raw.githubusercontent.com/statsbomb/open-data/master/data/competitions.json"
 MATCHES_URL = "https://raw.githubusercontent.com/statsbomb/open-data/master/data/matches/{competition_id}/{season_id}.json"
-
-
-@dataclass
-class TeamStats:
-    matches: int = 0
-    goals_for: int = 0
-    goals_against: int = 0
-    points: int = 0
-
-    def strength(self) -> float:
-        if self.matches == 0:
-            return 70.0
-        return 60 + (self.points / self.matches) * 10 + (self.goal_diff() * 1.5)
-
-    def form(self) -> float:
-        if self.matches == 0:
-            return 0.6
-        return min(1.0, max(0.3, self.points / (self.matches * 3)))
-
-    def goal_diff(self) -> int:
-        return self.goals_for - self.goals_against
-
-
-@dataclass
-class DatasetRow:
-    date: str
-    team_a: str
-    team_b: str
-    strength_a: float
-    strength_b: float
-    form_a: float
-    form_b: float
-    xg_a: float
-    xg_b: float
-    injuries_a: int
-    injuries_b: int
-    shots_a: int
-    shots_b: int
-    poss_a: float
-    poss_b: float
-    goals_a: int
-    goals_b: int
-
-    def to_dict(self) -> Dict[str, object]:
-        return {
-            "date": self.date,
-            "team_a": self.team_a,
-            "team_b": self.team_b,
-            "strength_a": round(self.strength_a, 2),
-            "strength_b": round(self.strength_b, 2),
-            "form_a": round(self.form_a, 2),
-            "form_b": round(self.form_b, 2),
-            "xg_a": round(self.xg_a, 2),
-            "xg_b": round(self.xg_b, 2),
-            "injuries_a": self.injuries_a,
-            "injuries_b": self.injuries_b,
-            "shots_a": self.shots_a,
-            "shots_b": self.shots_b,
-            "poss_a": round(self.poss_a, 1),
-            "poss_b": round(self.poss_b, 1),
-            "goals_a": self.goals_a,
-            "goals_b": self.goals_b,
-        }
+HTTP_CACHE_DIR = Path(__file__).parent / ".http_cache"
+
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# url -> (etag, parsed payload), so a 304 skips both the download and the parse
+_PARSED: Dict[str, Tuple[str, list]] = {}
+
+
+DATASET_COLUMNS = [
+    "date",
+    "team_a",
+    "team_b",
+    "strength_a",
+    "strength_b",
+    "form_a",
+    "form_b",
+    "xg_a",
+    "xg_b",
+    "injuries_a",
+    "injuries_b",
+    "shots_a",
+    "shots_b",
+    "poss_a",
+    "poss_b",
+    "goals_a",
+    "goals_b",
+]
+
+ROUNDING = {
+    "strength_a": 2,
+    "strength_b": 2,
+    "form_a": 2,
+    "form_b": 2,
+    "xg_a": 2,
+    "xg_b": 2,
+    "poss_a": 1,
+    "poss_b": 1,
+}
+
+
+def team_strength(matches, points, goal_diff):
+    played = np.maximum(matches, 1)
+    return np.where(matches == 0, 70.0, 60 + (points / played) * 10 + goal_diff * 1.5)
+
+
+def team_form(matches, points):
+    played = np.maximum(matches, 1)
+    return np.where(matches == 0, 0.6, np.clip(points / (played * 3), 0.3, 1.0))
+
+
+def _cache_paths(url: str) -> Tuple[Path, Path]:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return HTTP_CACHE_DIR / f"{key}.json", HTTP_CACHE_DIR / f"{key}.etag"
 
 
 def fetch_json(url: str) -> list:
-    response = requests.get(url, timeout=20)
-    response.raise_for_status()
-    return response.json()
+    body_path, etag_path = _cache_paths(url)
+    etag = etag_path.read_text(encoding="utf-8") if body_path.exists() and etag_path.exists() else None
+    headers = {"If-None-Match": etag} if etag else {}
+
+    response = _SESSION.get(url, headers=headers, timeout=20)
+    if response.status_code == 304:
+        cached = _PARSED.get(url)
+        if cached and cached[0] == etag:
+            return cached[1]
+        content = body_path.read_bytes()
+    else:
+        response.raise_for_status()
+        content = response.content
+        etag = response.headers.get("ETag")
+        if etag:
+            HTTP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            body_path.write_bytes(content)
+            etag_path.write_text(etag, encoding="utf-8")
+
+    data = orjson.loads(content)
+    if etag:
+        _PARSED[url] = (etag, data)
+    return data
 
 
 def list_competitions() -> list:
@@ -89,84 +103,79 @@ def load_matches(competition_id: int, season_id: int) -> list:
     return fetch_json(url)
 
 
-def build_dataset(matches: list) -> List[DatasetRow]:
-    stats: Dict[str, TeamStats] = {}
-    rows: List[DatasetRow] = []
-
-    def ensure(team: str) -> TeamStats:
-        if team not in stats:
-            stats[team] = TeamStats()
-        return stats[team]
-
-    for match in matches:
-        home = match["home_team"]["home_team_name"]
-        away = match["away_team"]["away_team_name"]
-        date = match.get("match_date") or match.get("kick_off") or "unknown"
-        goals_a = int(match.get("home_score") or 0)
-        goals_b = int(match.get("away_score") or 0)
-
-        home_stats = ensure(home)
-        away_stats = ensure(away)
-
-        strength_a = home_stats.strength()
-        strength_b = away_stats.strength()
-        form_a = home_stats.form()
-        form_b = away_stats.form()
-
-        xg_a = max(0.4, goals_a * 0.9 + 0.6)
-        xg_b = max(0.4, goals_b * 0.9 + 0.6)
-        shots_a = max(6, goals_a * 5 + 7)
-        shots_b = max(6, goals_b * 5 + 7)
-        poss_a = min(65.0, max(35.0, 50 + (strength_a - strength_b) * 0.3))
-        poss_b = 100 - poss_a
-
-        row = DatasetRow(
-            date=date,
-            team_a=home,
-            team_b=away,
-            strength_a=strength_a,
-            strength_b=strength_b,
-            form_a=form_a,
-            form_b=form_b,
-            xg_a=xg_a,
-            xg_b=xg_b,
-            injuries_a=1,
-            injuries_b=1,
-            shots_a=shots_a,
-            shots_b=shots_b,
-            poss_a=poss_a,
-            poss_b=poss_b,
-            goals_a=goals_a,
-            goals_b=goals_b,
-        )
-        rows.append(row)
-
-        # Update stats after match
-        home_stats.matches += 1
-        away_stats.matches += 1
-        home_stats.goals_for += goals_a
-        home_stats.goals_against += goals_b
-        away_stats.goals_for += goals_b
-        away_stats.goals_against += goals_a
-
-        if goals_a > goals_b:
-            home_stats.points += 3
-        elif goals_b > goals_a:
-            away_stats.points += 3
-        else:
-            home_stats.points += 1
-            away_stats.points += 1
-
-    return rows
-
-
-def save_csv(rows: Iterable[DatasetRow], path: Path) -> None:
+def build_dataset(matches: list) -> pd.DataFrame:
+    home = [match["home_team"]["home_team_name"] for match in matches]
+    away = [match["away_team"]["away_team_name"] for match in matches]
+    dates = [match.get("match_date") or match.get("kick_off") or "unknown" for match in matches]
+    goals_a = np.array([int(match.get("home_score") or 0) for match in matches], dtype=np.int64)
+    goals_b = np.array([int(match.get("away_score") or 0) for match in matches], dtype=np.int64)
+    count = len(matches)
+
+    points_a = np.where(goals_a > goals_b, 3, np.where(goals_a == goals_b, 1, 0))
+    points_b = np.where(goals_b > goals_a, 3, np.where(goals_a == goals_b, 1, 0))
+
+    # One row per (match, team), interleaved home/away so that cumulative sums
+    # follow match order. Subtracting the current match yields pre-match stats.
+    order = np.arange(2 * count).reshape(2, count).T.ravel()
+    team_ids, _ = pd.factorize(np.concatenate([home, away]).astype(object)[order])
+    results = pd.DataFrame(
+        {
+            "goals_for": np.concatenate([goals_a, goals_b])[order],
+            "goals_against": np.concatenate([goals_b, goals_a])[order],
+            "points": np.concatenate([points_a, points_b])[order],
+        }
+    )
+    grouped = results.groupby(team_ids, sort=False)
+    before = (grouped.cumsum() - results).to_numpy()
+    played = grouped.cumcount().to_numpy()
+
+    strength = team_strength(played, before[:, 2], before[:, 0] - before[:, 1])
+    form = team_form(played, before[:, 2])
+
+    strength_a, strength_b = strength[0::2], strength[1::2]
+    poss_a = np.clip(50 + (strength_a - strength_b) * 0.3, 35.0, 65.0)
+
+    df = pd.DataFrame(
+        {
+            "date": dates,
+            "team_a": home,
+            "team_b": away,
+            "strength_a": strength_a,
+            "strength_b": strength_b,
+            "form_a": form[0::2],
+            "form_b": form[1::2],
+            "xg_a": np.maximum(0.4, goals_a * 0.9 + 0.6),
+            "xg_b": np.maximum(0.4, goals_b * 0.9 + 0.6),
+            "injuries_a": 1,
+            "injuries_b": 1,
+            "shots_a": np.maximum(6, goals_a * 5 + 7),
+            "shots_b": np.maximum(6, goals_b * 5 + 7),
+            "poss_a": poss_a,
+            "poss_b": 100 - poss_a,
+            "goals_a": goals_a,
+            "goals_b": goals_b,
+        },
+        columns=DATASET_COLUMNS,
+    )
+    return df
+
+
+def round_exact(values: pd.Series, digits: int) -> pd.Series:
+    # DataFrame.round scales by 10**digits first, which can move a value
+    # across a .5 boundary. Python's round works on the exact value, so it
+    # is applied to the few values that sit near a tie.
+    rounded = values.round(digits)
+    scaled = values.to_numpy() * 10.0**digits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(value, digits) for value in values[near_tie]]
+    return rounded
+
+
+def save_csv(rows: pd.DataFrame, path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=DatasetRow.__annotations__.keys())
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row.to_dict())
+    rounded = rows.assign(**{name: round_exact(rows[name], digits) for name, digits in ROUNDING.items()})
+    rounded.to_csv(path, index=False, lineterminator="\r\n")
 
 
 def ingest_statsbomb(
@@ -1,24 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
-import random
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 
-import joblib
-import pandas as pd
-from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile
+import numpy as np
+import orjson
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
-from ingest_statsbomb import ingest_statsbomb
-from training import FEATURES, train_compare, train_model
+from features import FEATURES, OUTCOMES
 
 BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / "data"
 MODELS_DIR = BASE_DIR / "models"
 LEGACY_DATA_PATH = DATA_DIR / "matches.csv"
 
+logger = logging.getLogger(__name__)
+
 SPORTS = ("football", "basketball", "tennis", "rugby", "handball")
 
 SPORT_TEAMS = {
@@ -37,99 +49,121 @@ SPORT_BASELINES = {
     "handball": {"mean_a": 31.0, "mean_b": 28.0, "max_score": 45, "poss_base": 50},
 }
 
+# Month cycles every 12 rows and day every 28, so the sequence repeats every 84.
+MATCH_DATES = np.array([f"2025-{((i % 12) + 1):02d}-{((i % 28) + 1):02d}" for i in range(84)], dtype=object)
+
+
+# Bounded: keys are raw client input, including invalid values.
+@lru_cache(maxsize=256)
+def _lookup_sport(sport: str) -> Optional[str]:
+    value = sport.strip().lower()
+    return value if value in SPORTS else None
+
 
 def normalize_sport(sport: Optional[str]) -> str:
     if not sport:
         return "football"
-    value = sport.strip().lower()
-    if value not in SPORTS:
+    value = _lookup_sport(sport)
+    if value is None:
         raise HTTPException(status_code=400, detail={"error": "Invalid sport", "sports": list(SPORTS)})
     return value
 
 
-def sport_paths(sport: str) -> Dict[str, Path]:
-    return {
-        "data": DATA_DIR / f"{sport}_matches.csv",
-        "model": MODELS_DIR / f"{sport}_model.joblib",
-        "logistic": MODELS_DIR / f"{sport}_model_logistic.joblib",
-        "rf": MODELS_DIR / f"{sport}_model_rf.joblib",
-        "metrics": MODELS_DIR / f"{sport}_metrics.json",
-        "compare": MODELS_DIR / f"{sport}_metrics_compare.json",
-        "active": MODELS_DIR / f"{sport}_active_model.json",
-    }
+@lru_cache(maxsize=None)
+def sport_paths(sport: str) -> Mapping[str, Path]:
+    # Read-only view: the same mapping is shared by every caller.
+    return MappingProxyType(
+        {
+            "data": DATA_DIR / f"{sport}_matches.csv",
+            "model": MODELS_DIR / f"{sport}_model.joblib",
+            "logistic": MODELS_DIR / f"{sport}_model_logistic.joblib",
+            "rf": MODELS_DIR / f"{sport}_model_rf.joblib",
+            "metrics": MODELS_DIR / f"{sport}_metrics.json",
+            "compare": MODELS_DIR / f"{sport}_metrics_compare.json",
+            "active": MODELS_DIR / f"{sport}_active_model.json",
+        }
+    )
+
 
+def generate_dataset(sport: str, rows: int = 240):
+    import pandas as pd
 
-def generate_dataset(sport: str, rows: int = 240) -> pd.DataFrame:
     seed = 100 + sum(ord(char) for char in sport)
-    rng = random.Random(seed)
-    teams = SPORT_TEAMS[sport]
+    rng = np.random.default_rng(seed)
+    teams = np.array(SPORT_TEAMS[sport], dtype=object)
     base = SPORT_BASELINES[sport]
 
-    data = []
-    for i in range(rows):
-        team_a = teams[rng.randint(0, len(teams) - 1)]
-        team_b = teams[rng.randint(0, len(teams) - 1)]
-        while team_b == team_a:
-            team_b = teams[rng.randint(0, len(teams) - 1)]
-
-        strength_a = rng.randint(55, 92)
-        strength_b = rng.randint(55, 92)
-        form_a = round(rng.uniform(0.35, 0.95), 3)
-        form_b = round(rng.uniform(0.35, 0.95), 3)
-        injuries_a = rng.randint(0, 4)
-        injuries_b = rng.randint(0, 4)
-
-        quality_a = (strength_a / 100) + form_a - injuries_a * 0.06
-        quality_b = (strength_b / 100) + form_b - injuries_b * 0.06
-        delta = quality_a - quality_b
-
-        score_a = max(0, round(base["mean_a"] + delta * base["mean_a"] * 0.6 + rng.uniform(-1.2, 1.2)))
-        score_b = max(0, round(base["mean_b"] - delta * base["mean_b"] * 0.6 + rng.uniform(-1.2, 1.2)))
-        score_a = min(score_a, base["max_score"])
-        score_b = min(score_b, base["max_score"])
-
-        shots_a = max(1, int((score_a + 1) * rng.uniform(2.5, 7.5)))
-        shots_b = max(1, int((score_b + 1) * rng.uniform(2.5, 7.5)))
-        xg_a = round(min(base["max_score"], score_a * rng.uniform(0.75, 1.2) + rng.uniform(0.1, 0.9)), 2)
-        xg_b = round(min(base["max_score"], score_b * rng.uniform(0.75, 1.2) + rng.uniform(0.1, 0.9)), 2)
-        poss_a = round(base["poss_base"] + delta * 10 + rng.uniform(-5, 5), 2)
-        poss_a = max(25.0, min(75.0, poss_a))
-        poss_b = round(100.0 - poss_a, 2)
-
-        data.append(
-            {
-                "date": f"2025-{((i % 12) + 1):02d}-{((i % 28) + 1):02d}",
-                "team_a": team_a,
-                "team_b": team_b,
-                "goals_a": score_a,
-                "goals_b": score_b,
-                "strength_a": strength_a,
-                "strength_b": strength_b,
-                "form_a": form_a,
-                "form_b": form_b,
-                "xg_a": xg_a,
-                "xg_b": xg_b,
-                "injuries_a": injuries_a,
-                "injuries_b": injuries_b,
-                "shots_a": shots_a,
-                "shots_b": shots_b,
-                "poss_a": poss_a,
-                "poss_b": poss_b,
-            }
-        )
+    # Offsetting by 1..n-1 (mod n) draws a distinct opponent without rejection.
+    idx_a = rng.integers(0, len(teams), size=rows)
+    idx_b = (idx_a + rng.integers(1, len(teams), size=rows)) % len(teams)
+
+    # Each a/b column pair comes from a single (2, rows) draw.
+    strength_a, strength_b = rng.integers(55, 93, size=(2, rows))
+    form_a, form_b = rng.uniform(0.35, 0.95, size=(2, rows)).round(3)
+    injuries_a, injuries_b = rng.integers(0, 5, size=(2, rows))
+    noise_a, noise_b = rng.uniform(-1.2, 1.2, size=(2, rows))
+    shot_rate_a, shot_rate_b = rng.uniform(2.5, 7.5, size=(2, rows))
+    xg_rate_a, xg_rate_b = rng.uniform(0.75, 1.2, size=(2, rows))
+    xg_base_a, xg_base_b = rng.uniform(0.1, 0.9, size=(2, rows))
+    poss_noise = rng.uniform(-5, 5, size=rows)
+
+    quality_a = (strength_a / 100) + form_a - injuries_a * 0.06
+    quality_b = (strength_b / 100) + form_b - injuries_b * 0.06
+    delta = quality_a - quality_b
+
+    score_a = np.round(base["mean_a"] + delta * base["mean_a"] * 0.6 + noise_a)
+    score_b = np.round(base["mean_b"] - delta * base["mean_b"] * 0.6 + noise_b)
+    score_a = np.clip(score_a, 0, base["max_score"]).astype(np.int64)
+    score_b = np.clip(score_b, 0, base["max_score"]).astype(np.int64)
+
+    shots_a = np.maximum(1, ((score_a + 1) * shot_rate_a).astype(np.int64))
+    shots_b = np.maximum(1, ((score_b + 1) * shot_rate_b).astype(np.int64))
+    xg_a = np.minimum(base["max_score"], score_a * xg_rate_a + xg_base_a).round(2)
+    xg_b = np.minimum(base["max_score"], score_b * xg_rate_b + xg_base_b).round(2)
+    poss_a = np.clip((base["poss_base"] + delta * 10 + poss_noise).round(2), 25.0, 75.0)
+    poss_b = (100.0 - poss_a).round(2)
+
+    return pd.DataFrame(
+        {
+            "date": MATCH_DATES.take(np.arange(rows) % len(MATCH_DATES)),
+            "team_a": teams.take(idx_a),
+            "team_b": teams.take(idx_b),
+            "goals_a": score_a,
+            "goals_b": score_b,
+            "strength_a": strength_a,
+            "strength_b": strength_b,
+            "form_a": form_a,
+            "form_b": form_b,
+            "xg_a": xg_a,
+            "xg_b": xg_b,
+            "injuries_a": injuries_a,
+            "injuries_b": injuries_b,
+            "shots_a": shots_a,
+            "shots_b": shots_b,
+            "poss_a": poss_a,
+            "poss_b": poss_b,
+        }
+    )
 
-    return pd.DataFrame(data)
+
+def mirror_file(source: Path, target: Path):
+    # copyfile uses the kernel's zero-copy path (sendfile/copy_file_range)
+    # where available. No hardlink: in-place rewrites of one file (e.g. a
+    # /train upload) would then silently change the other as well.
+    if target.exists() and os.path.samefile(source, target):
+        return
+    shutil.copyfile(source, target)
 
 
 def ensure_data_for_sport(sport: str) -> Path:
     paths = sport_paths(sport)
-    paths["data"].parent.mkdir(parents=True, exist_ok=True)
-
     if paths["data"].exists():
         return paths["data"]
 
+    paths["data"].parent.mkdir(parents=True, exist_ok=True)
+
     if sport == "football" and LEGACY_DATA_PATH.exists():
-        paths["data"].write_bytes(LEGACY_DATA_PATH.read_bytes())
+        mirror_file(LEGACY_DATA_PATH, paths["data"])
         return paths["data"]
 
     generated = generate_dataset(sport, rows=260 if sport == "football" else 220)
@@ -137,31 +171,95 @@ def ensure_data_for_sport(sport: str) -> Path:
     return paths["data"]
 
 
+_json_cache: Dict[Path, Tuple[Tuple[int, int], Optional[dict]]] = {}
+
+
 def read_json(path: Path) -> Optional[dict]:
-    if not path.exists():
-        return None
+    # Parsed payloads are reused until the file's mtime/size changes, so
+    # re-checking a metadata file costs a single stat() call.
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
+        stat = path.stat()
+    except FileNotFoundError:
+        _json_cache.pop(path, None)
         return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _json_cache.get(path)
+    if cached and cached[0] == version:
+        return cached[1]
+    data = path.read_bytes()
+    try:
+        payload = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # Reports written by json.dumps may hold NaN, which orjson rejects.
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            payload = None
+    _json_cache[path] = (version, payload)
+    return payload
+
+
+_created_dirs = set()
 
 
 def write_json(path: Path, payload: dict):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    if path.parent not in _created_dirs:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _created_dirs.add(path.parent)
+    # Write a per-writer temp file, then rename: readers never see a partial
+    # file, even with several workers writing the same path.
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
 
 state = {
     sport: {
         "active_model": "logistic",
         "model": None,
+        "model_checked": False,
+        "named_input": False,
+        "linear": None,
+        "classes": (),
+        "home_idx": None,
+        "away_idx": None,
         "metrics_cache": None,
         "compare_cache": None,
+        "health_bytes": None,
+        "health_etag": None,
+        "load_error": None,
     }
     for sport in SPORTS
 }
 
 
+def refresh_health(sport: str):
+    # /health is served as these bytes until the active model, the loaded
+    # model or the metrics change.
+    current = state[sport]
+    cache = current["metrics_cache"]
+    body = orjson.dumps(
+        {
+            "status": "ok",
+            "sport": sport,
+            "sports": list(SPORTS),
+            "model_loaded": current["model"] is not None,
+            "rows": cache.get("rows") if cache else None,
+            "model": cache.get("model") if cache else None,
+            "active": current["active_model"],
+            "load_error": current["load_error"],
+        }
+    )
+    current.update(
+        health_bytes=body,
+        health_etag=f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"',
+    )
+
+
 def load_active(sport: str):
     paths = sport_paths(sport)
     active = read_json(paths["active"])
@@ -171,6 +269,81 @@ def load_active(sport: str):
 def write_active(sport: str, name: str):
     write_json(sport_paths(sport)["active"], {"model": name})
     state[sport]["active_model"] = name
+    refresh_health(sport)
+
+
+def _as_scaler(step):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler
+
+    if isinstance(step, ColumnTransformer):
+        fitted = [(trans, cols) for _, trans, cols in step.transformers_ if trans != "drop"]
+        if len(fitted) != 1 or list(fitted[0][1]) != FEATURES:
+            return None
+        step = fitted[0][0]
+    return step if isinstance(step, StandardScaler) else None
+
+
+def compile_linear(model) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Fold a scaler + LogisticRegression pipeline into (coef, intercept), else None."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    steps = model.steps if isinstance(model, Pipeline) else [("clf", model)]
+    clf = steps[-1][1]
+    if not isinstance(clf, LogisticRegression):
+        return None
+
+    multi_class = getattr(clf, "multi_class", "auto")
+    ovr = multi_class == "ovr" or (
+        multi_class != "multinomial" and (len(clf.classes_) <= 2 or clf.solver == "liblinear")
+    )
+    if ovr and len(clf.classes_) > 2:
+        return None
+
+    coef = clf.coef_.astype(np.float64)
+    intercept = clf.intercept_.astype(np.float64)
+    for _, step in reversed(steps[:-1]):
+        if step is None or step == "passthrough":
+            continue
+        scaler = _as_scaler(step)
+        if scaler is None:
+            return None
+        # mean_ is fitted even when with_mean=False, so follow the flags that
+        # transform() uses rather than which attributes are set.
+        if scaler.with_std:
+            coef = coef / scaler.scale_
+        if scaler.with_mean:
+            intercept = intercept - coef @ scaler.mean_
+
+    if coef.shape[0] == 1:
+        # Binary: one-vs-rest is sigmoid(z), multinomial is softmax(-z, z).
+        other = np.zeros_like(coef) if ovr else -coef
+        coef = np.vstack([other, coef])
+        intercept = np.concatenate([np.zeros(1) if ovr else -intercept, intercept])
+    return coef.astype(np.float32), intercept.astype(np.float32)
+
+
+def read_model(model_path: Path):
+    import joblib
+
+    # Uncompressed dumps are mmapped; artifacts are replaced, never rewritten.
+    # Windows cannot replace a mapped file, so models load into memory there.
+    if os.name == "nt":
+        return joblib.load(model_path)
+    with model_path.open("rb") as f:
+        raw_pickle = f.read(1) == b"\x80"
+    return joblib.load(model_path, mmap_mode="r" if raw_pickle else None)
+
+
+def serve_single_threaded(model) -> None:
+    # Forests trained with n_jobs=-1 would start a worker pool per request.
+    if model is None:
+        return
+    steps = model.steps if hasattr(model, "steps") else [("clf", model)]
+    for _, step in steps:
+        if getattr(step, "n_jobs", None) not in (None, 1):
+            step.n_jobs = None
 
 
 def load_model(sport: str):
@@ -180,7 +353,29 @@ def load_model(sport: str):
     if not model_path.exists():
         model_path = paths["model"]
 
-    state[sport]["model"] = joblib.load(model_path) if model_path.exists() else None
+    try:
+        model = read_model(model_path) if model_path.exists() else None
+    except Exception as exc:
+        state[sport]["load_error"] = f"{type(exc).__name__}: {exc}"
+        refresh_health(sport)
+        raise
+    serve_single_threaded(model)
+    # Current models predict outcome codes; older artifacts used the names.
+    classes = tuple(OUTCOMES[c] if not isinstance(c, str) else c for c in model.classes_) if model is not None else ()
+    loaded = {
+        "model": model,
+        # Artifacts trained before the ndarray pipelines select columns by name.
+        "named_input": hasattr(model, "feature_names_in_"),
+        "linear": compile_linear(model) if model is not None else None,
+        "classes": classes,
+        "home_idx": classes.index("home_win") if "home_win" in classes else None,
+        "away_idx": classes.index("away_win") if "away_win" in classes else None,
+        "model_checked": True,
+        "load_error": None,
+    }
+    # One update: requests read state[sport] while this runs on a worker thread.
+    state[sport].update(loaded)
+    refresh_health(sport)
 
 
 def load_metrics(sport: str):
@@ -188,28 +383,72 @@ def load_metrics(sport: str):
     compare = read_json(paths["compare"])
     active = state[sport]["active_model"]
     if compare and active in compare:
-        state[sport]["metrics_cache"] = compare[active]
-        return
-    state[sport]["metrics_cache"] = read_json(paths["metrics"])
+        metrics = compare[active]
+    else:
+        metrics = read_json(paths["metrics"])
+    # read_json returns the same object while the file is unchanged.
+    if metrics is not state[sport]["metrics_cache"] or state[sport]["health_bytes"] is None:
+        state[sport]["metrics_cache"] = metrics
+        refresh_health(sport)
 
 
 def load_compare(sport: str):
     state[sport]["compare_cache"] = read_json(sport_paths(sport)["compare"])
 
 
-def boot_sport(sport: str):
-    ensure_data_for_sport(sport)
+def boot_meta(sport: str):
     load_active(sport)
-    load_model(sport)
     load_metrics(sport)
     load_compare(sport)
 
 
+# Every model load for a sport holds its lock, so loads never overtake each other.
+_boot_locks = {sport: asyncio.Lock() for sport in SPORTS}
+_boot_executor = ThreadPoolExecutor(max_workers=len(SPORTS), thread_name_prefix="boot")
+
+
+async def ensure_model(sport: str):
+    if state[sport]["model_checked"]:
+        return
+    async with _boot_locks[sport]:
+        if not state[sport]["model_checked"]:
+            await asyncio.get_running_loop().run_in_executor(_boot_executor, load_model, sport)
+
+
+async def reload_model(sport: str, active: Optional[str] = None):
+    """Reload the served model, switching the active one first if given."""
+    async with _boot_locks[sport]:
+        if active is not None:
+            write_active(sport, active)
+        await asyncio.get_running_loop().run_in_executor(_boot_executor, load_model, sport)
+        load_metrics(sport)
+
+
 for _sport in SPORTS:
-    boot_sport(_sport)
+    boot_meta(_sport)
+
+
+async def warm_model(sport: str):
+    try:
+        await ensure_model(sport)
+    except Exception:
+        logger.exception("Loading the %s model failed", sport)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Background warm-up; it takes the same per-sport locks as reload_model.
+    warmup = asyncio.gather(*(warm_model(sport) for sport in SPORTS))
+    yield
+    warmup.cancel()
 
 
-app = FastAPI(title="Sport AI Service", version="2.0.0")
+app = FastAPI(
+    title="Sport AI Service",
+    version="2.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -236,6 +475,10 @@ class PredictRequest(BaseModel):
     matchId: Optional[str] = None
 
 
+class BatchPredictRequest(BaseModel):
+    items: List[PredictRequest]
+
+
 class IngestRequest(BaseModel):
     sport: str = "football"
     competitionId: Optional[int] = None
@@ -264,35 +507,65 @@ def fallback_prediction(payload: PredictRequest, sport: str) -> dict:
     }
 
 
+_buffers = threading.local()
+
+
+def fill_features(row: np.ndarray, payload: PredictRequest):
+    # FEATURES order: (a, b) pairs for the base stats, then the a - b diffs.
+    row[:12] = (
+        payload.strengthA,
+        payload.strengthB,
+        payload.formA,
+        payload.formB,
+        payload.xgA,
+        payload.xgB,
+        payload.injuriesA,
+        payload.injuriesB,
+        payload.shotsA,
+        payload.shotsB,
+        payload.possessionA,
+        payload.possessionB,
+    )
+    np.subtract(row[0:12:2], row[1:12:2], out=row[12:])
+
+
+def feature_row(payload: PredictRequest) -> np.ndarray:
+    buffer = getattr(_buffers, "row", None)
+    if buffer is None:
+        buffer = _buffers.row = np.empty((1, len(FEATURES)), dtype=np.float32)
+    fill_features(buffer[0], payload)
+    return buffer
+
+
 @app.get("/sports")
 async def sports():
     return {"sports": list(SPORTS)}
 
 
 @app.get("/health")
-async def health(sport: str = Query("football")):
+async def health(request: Request, sport: str = Query("football")):
     current = normalize_sport(sport)
-    cache = state[current]["metrics_cache"]
-    return {
-        "status": "ok",
-        "sport": current,
-        "sports": list(SPORTS),
-        "model_loaded": state[current]["model"] is not None,
-        "rows": cache.get("rows") if cache else None,
-        "model": cache.get("model") if cache else None,
-        "active": state[current]["active_model"],
-    }
+    etag = state[current]["health_etag"]
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=state[current]["health_bytes"],
+        media_type="application/json",
+        headers={"ETag": etag},
+    )
 
 
 @app.get("/metrics")
 async def metrics(sport: str = Query("football")):
     current = normalize_sport(sport)
+    load_metrics(current)
     return state[current]["metrics_cache"] or {}
 
 
 @app.get("/metrics/compare")
 async def metrics_compare(sport: str = Query("football")):
     current = normalize_sport(sport)
+    load_compare(current)
     return state[current]["compare_cache"] or {}
 
 
@@ -306,59 +579,79 @@ async def model_active(sport: str = Query("football")):
 async def model_select(payload: ModelSelectRequest):
     current = normalize_sport(payload.sport)
     name = payload.model if payload.model in {"logistic", "rf"} else "logistic"
-    write_active(current, name)
-    load_model(current)
-    load_metrics(current)
+    await reload_model(current, active=name)
     return {"status": "ok", "sport": current, "active": state[current]["active_model"]}
 
 
+def predict_probs(sport: str, features: np.ndarray) -> np.ndarray:
+    linear = state[sport]["linear"]
+    if linear is not None:
+        coef, intercept = linear
+        logits = features @ coef.T + intercept
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    if state[sport]["named_input"]:
+        import pandas as pd
+
+        features = pd.DataFrame(features, columns=FEATURES)
+    return state[sport]["model"].predict_proba(features)
+
+
+def build_prediction(sport: str, probs: np.ndarray, match_id: Optional[str]) -> dict:
+    current = state[sport]
+    best = int(probs.argmax())
+    home = float(probs[current["home_idx"]]) if current["home_idx"] is not None else 0.0
+    away = float(probs[current["away_idx"]]) if current["away_idx"] is not None else 0.0
+
+    return {
+        "sport": sport,
+        "prediction": current["classes"][best],
+        "confidence": float(probs[best]),
+        "score": home - away,
+        "probabilities": dict(zip(current["classes"], probs.tolist())),
+        "model": state[sport]["active_model"],
+        "match_id": match_id,
+    }
+
+
 @app.post("/predict")
 async def predict(payload: PredictRequest):
     sport = normalize_sport(payload.sport)
-    model = state[sport]["model"]
-    features = {
-        "strength_a": payload.strengthA,
-        "strength_b": payload.strengthB,
-        "form_a": payload.formA,
-        "form_b": payload.formB,
-        "xg_a": payload.xgA,
-        "xg_b": payload.xgB,
-        "injuries_a": payload.injuriesA,
-        "injuries_b": payload.injuriesB,
-        "shots_a": payload.shotsA,
-        "shots_b": payload.shotsB,
-        "poss_a": payload.possessionA,
-        "poss_b": payload.possessionB,
-        "strength_diff": payload.strengthA - payload.strengthB,
-        "form_diff": payload.formA - payload.formB,
-        "xg_diff": payload.xgA - payload.xgB,
-        "injuries_diff": payload.injuriesA - payload.injuriesB,
-        "shots_diff": payload.shotsA - payload.shotsB,
-        "poss_diff": payload.possessionA - payload.possessionB,
-    }
-
-    if model is None:
+    await ensure_model(sport)
+    if state[sport]["model"] is None:
         fallback = fallback_prediction(payload, sport)
         fallback["match_id"] = payload.matchId
         return fallback
 
-    df = pd.DataFrame([features], columns=FEATURES)
-    probs = model.predict_proba(df)[0]
-    classes = list(model.classes_)
-    prob_map = dict(zip(classes, [float(p) for p in probs]))
-    prediction = max(prob_map, key=prob_map.get)
-    confidence = prob_map[prediction]
-    score = prob_map.get("home_win", 0.0) - prob_map.get("away_win", 0.0)
+    probs = predict_probs(sport, feature_row(payload))[0]
+    return build_prediction(sport, probs, payload.matchId)
 
-    return {
-        "sport": sport,
-        "prediction": prediction,
-        "confidence": confidence,
-        "score": score,
-        "probabilities": prob_map,
-        "model": state[sport]["active_model"],
-        "match_id": payload.matchId,
-    }
+
+@app.post("/predict/batch")
+async def predict_batch(payload: BatchPredictRequest):
+    items = payload.items
+    sports = [normalize_sport(item.sport) for item in items]
+    results: List[Optional[dict]] = [None] * len(items)
+
+    # One feature matrix and one scoring call per sport present in the batch.
+    for sport in dict.fromkeys(sports):
+        await ensure_model(sport)
+        positions = [idx for idx, value in enumerate(sports) if value == sport]
+        if state[sport]["model"] is None:
+            for idx in positions:
+                fallback = fallback_prediction(items[idx], sport)
+                fallback["match_id"] = items[idx].matchId
+                results[idx] = fallback
+            continue
+
+        features = np.empty((len(positions), len(FEATURES)), dtype=np.float32)
+        for row, idx in zip(features, positions):
+            fill_features(row, items[idx])
+        for idx, probs in zip(positions, predict_probs(sport, features)):
+            results[idx] = build_prediction(sport, probs, items[idx].matchId)
+
+    return {"predictions": results}
 
 
 @app.post("/train")
@@ -367,14 +660,14 @@ async def train(
     algo: str = Form("logistic"),
     sport: str = Form("football"),
 ):
+    from training import train_model
+
     current = normalize_sport(sport)
     paths = sport_paths(current)
     content = await file.read()
     paths["data"].write_bytes(content)
     metrics_data = train_model(paths["data"], paths["model"], paths["metrics"], algo=algo)
-    write_active(current, algo if algo in {"logistic", "rf"} else "logistic")
-    load_model(current)
-    load_metrics(current)
+    await reload_model(current, active=algo if algo in {"logistic", "rf"} else "logistic")
     return {"status": "trained", "sport": current, "metrics": metrics_data}
 
 
@@ -383,19 +676,21 @@ async def train_refresh(
     algo: str = Form("logistic"),
     sport: str = Form("football"),
 ):
+    from training import train_model
+
     current = normalize_sport(sport)
     paths = sport_paths(current)
     if not paths["data"].exists():
         ensure_data_for_sport(current)
     metrics_data = train_model(paths["data"], paths["model"], paths["metrics"], algo=algo)
-    write_active(current, algo if algo in {"logistic", "rf"} else "logistic")
-    load_model(current)
-    load_metrics(current)
+    await reload_model(current, active=algo if algo in {"logistic", "rf"} else "logistic")
     return {"status": "trained", "sport": current, "metrics": metrics_data}
 
 
 @app.post("/train/compare")
 async def train_compare_endpoint(sport: str = Form("football")):
+    from training import train_compare
+
     current = normalize_sport(sport)
     paths = sport_paths(current)
     if not paths["data"].exists():
@@ -415,6 +710,9 @@ async def ingest_statsbomb_endpoint(payload: IngestRequest):
             detail="StatsBomb Open Data is currently supported for football only.",
         )
 
+    from ingest_statsbomb import ingest_statsbomb
+    from training import train_compare, train_model
+
     paths = sport_paths("football")
     path, comp, season, count = ingest_statsbomb(
         paths["data"],
@@ -422,13 +720,11 @@ async def ingest_statsbomb_endpoint(payload: IngestRequest):
         season_id=payload.seasonId,
     )
     # Keep backward compatibility with previous tooling expecting ai/data/matches.csv
-    LEGACY_DATA_PATH.write_bytes(path.read_bytes())
+    mirror_file(path, LEGACY_DATA_PATH)
 
     metrics_data = train_model(path, paths["model"], paths["metrics"], algo="logistic")
     train_compare(path, paths["compare"], paths["logistic"], paths["rf"])
-    write_active("football", "logistic")
-    load_model("football")
-    load_metrics("football")
+    await reload_model("football", active="logistic")
     load_compare("football")
 
     return {
@@ -1,90 +1,82 @@
-import json
+import os
+import pickle
+import uuid
+import warnings
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import joblib
+import numpy as np
+import orjson
 import pandas as pd
-from sklearn.compose import ColumnTransformer
+
+try:
+    # Optional Intel acceleration; must patch before the estimators are imported.
+    from sklearnex import patch_sklearn
+except ImportError:
+    pass
+else:
+    try:
+        patch_sklearn(["LogisticRegression", "RandomForestClassifier"])
+    except Exception as exc:
+        warnings.warn(f"sklearnex patch failed: {exc}")
+
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import (
-    accuracy_score,
-    auc,
-    confusion_matrix,
-    f1_score,
-    log_loss,
-    precision_recall_curve,
-    roc_curve,
-)
-from sklearn.model_selection import train_test_split
+from sklearn.metrics import auc, confusion_matrix, log_loss
+from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler, label_binarize
 
-BASE_FEATURES = [
-    "strength_a",
-    "strength_b",
-    "form_a",
-    "form_b",
-    "xg_a",
-    "xg_b",
-    "injuries_a",
-    "injuries_b",
-    "shots_a",
-    "shots_b",
-    "poss_a",
-    "poss_b",
-]
-
-DERIVED_FEATURES = [
-    "strength_diff",
-    "form_diff",
-    "xg_diff",
-    "injuries_diff",
-    "shots_diff",
-    "poss_diff",
-]
-
-FEATURES = BASE_FEATURES + DERIVED_FEATURES
+from features import BASE_FEATURES, DERIVED_FEATURES, FEATURES, OUTCOMES
+
+PARALLEL_MIN_ROWS = 5000
+GOAL_COLUMNS = ["goals_a", "goals_b"]
 
 
 def build_dataset(data_path: Path) -> pd.DataFrame:
-    df = pd.read_csv(data_path)
-    df["outcome"] = df.apply(
-        lambda row: "home_win"
-        if row["goals_a"] > row["goals_b"]
-        else "away_win"
-        if row["goals_a"] < row["goals_b"]
-        else "draw",
-        axis=1,
-    )
+    # Only the model inputs are parsed; fixed dtypes skip type inference.
+    # Goals stay float64 so uploads with "3.0" or blank cells still parse.
+    dtypes = {name: np.float64 for name in BASE_FEATURES + GOAL_COLUMNS}
+    df = pd.read_csv(data_path, usecols=BASE_FEATURES + GOAL_COLUMNS, dtype=dtypes)
+    # A missing score counts as a draw; sign + 1 is the index into
+    # OUTCOMES: away_win, draw, home_win.
+    diff = np.nan_to_num((df["goals_a"] - df["goals_b"]).to_numpy())
+    codes = (np.sign(diff) + 1).astype(np.int8)
+    df["outcome"] = pd.Categorical.from_codes(codes, categories=OUTCOMES)
     return df
 
 
 def add_derived_features(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["strength_diff"] = df["strength_a"] - df["strength_b"]
-    df["form_diff"] = df["form_a"] - df["form_b"]
-    df["xg_diff"] = df["xg_a"] - df["xg_b"]
-    df["injuries_diff"] = df["injuries_a"] - df["injuries_b"]
-    df["shots_diff"] = df["shots_a"] - df["shots_b"]
-    df["poss_diff"] = df["poss_a"] - df["poss_b"]
-    return df
-
-
-def build_preprocessor(algo: str) -> ColumnTransformer:
+    # BASE_FEATURES alternates (a, b) columns, so one strided subtraction
+    # yields every DERIVED_FEATURES column in order. assign() leaves the
+    # caller's frame alone without deep-copying its existing columns.
+    base = df[BASE_FEATURES].to_numpy()
+    diffs = base[:, 0::2] - base[:, 1::2]
+    return df.assign(**dict(zip(DERIVED_FEATURES, diffs.T)))
+
+
+def build_preprocessor(algo: str):
+    # Pipelines are fitted on plain arrays in FEATURES order so that serving
+    # can score a preallocated ndarray without building a DataFrame.
+    # Trees are scale-invariant, so the forest gets no preprocessing step.
     if algo == "logistic":
-        return ColumnTransformer([("scale", StandardScaler(), FEATURES)], remainder="drop")
-    return ColumnTransformer([("pass", "passthrough", FEATURES)], remainder="drop")
+        return StandardScaler()
+    return None
 
 
-def build_model(algo: str):
+def build_model(algo: str, rows: int = 0):
     if algo == "rf":
         return RandomForestClassifier(
             n_estimators=220,
+            max_features="sqrt",
             random_state=42,
             class_weight="balanced",
+            # Spawning workers costs more than it saves on small datasets.
+            n_jobs=-1 if rows >= PARALLEL_MIN_ROWS else None,
         )
     return LogisticRegression(
+        tol=1e-4,
         max_iter=300,
         multi_class="multinomial",
         solver="lbfgs",
@@ -94,116 +86,190 @@ def build_model(algo: str):
 
 def feature_importance_map(model, feature_names) -> Dict[str, float]:
     if hasattr(model, "coef_"):
-        import numpy as np
-
         coefs = getattr(model, "coef_")
-        importance = np.mean(np.abs(coefs), axis=0)
-        return {name: float(val) for name, val in zip(feature_names, importance)}
+        importance = np.abs(coefs).mean(axis=0)
+        return dict(zip(feature_names, importance.tolist()))
 
     if hasattr(model, "feature_importances_"):
         importances = getattr(model, "feature_importances_")
-        return {name: float(val) for name, val in zip(feature_names, importances)}
+        return dict(zip(feature_names, importances.tolist()))
 
     return {}
 
 
-def _downsample(values: List[float], max_points: int = 30) -> List[float]:
-    if len(values) <= max_points:
-        return [float(v) for v in values]
-    step = max(1, len(values) // max_points)
+def _downsample(values: np.ndarray, max_points: int = 30) -> List[float]:
+    if values.size <= max_points:
+        return values.tolist()
+    step = max(1, values.size // max_points)
     sampled = values[::step]
     if sampled[-1] != values[-1]:
-        sampled.append(values[-1])
-    return [float(v) for v in sampled]
-
-
-def roc_data(y_true, y_prob, classes: List[str]) -> Dict[str, dict]:
-    y_bin = label_binarize(y_true, classes=classes)
+        sampled = np.append(sampled, values[-1])
+    return sampled.tolist()
+
+
+def _f1_weighted(cm: np.ndarray) -> float:
+    # Support-weighted F1 from the confusion matrix; classes that are never
+    # predicted nor present score 0, as with f1_score's zero_division default.
+    tp = np.diag(cm)
+    denom = cm.sum(axis=0) + cm.sum(axis=1)
+    f1 = np.divide(2 * tp, denom, out=np.zeros(tp.size), where=denom != 0)
+    return np.average(f1, weights=cm.sum(axis=1))
+
+
+def _cumulative_counts(y_true: np.ndarray, scores: np.ndarray):
+    # Cumulative false/true positives at each distinct score, highest first
+    # (the counts behind sklearn's roc_curve and precision_recall_curve).
+    order = np.argsort(scores, kind="mergesort")[::-1]
+    scores = scores[order]
+    thresholds = np.r_[np.flatnonzero(np.diff(scores)), scores.size - 1]
+    tps = np.cumsum(y_true[order])[thresholds]
+    fps = 1 + thresholds - tps
+    return fps, tps
+
+
+def _binned_counts(y_true: np.ndarray, votes: np.ndarray, levels: int):
+    # Same counts as _cumulative_counts for integer scores in [0, levels],
+    # tallied with bincount instead of a sort.
+    total = np.bincount(votes, minlength=levels + 1)[::-1]
+    positive = np.bincount(votes[y_true == 1], minlength=levels + 1)[::-1]
+    seen = total > 0
+    tps = np.cumsum(positive)[seen]
+    fps = np.cumsum(total)[seen] - tps
+    return fps, tps
+
+
+def curve_data(
+    y_bin, y_prob, classes: List[str], levels: Optional[int] = None
+) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+    """ROC and PR curves per class, sharing one sort per class."""
     roc_map: Dict[str, dict] = {}
+    pr_map: Dict[str, dict] = {}
     for idx, label in enumerate(classes):
-        fpr, tpr, _ = roc_curve(y_bin[:, idx], y_prob[:, idx])
+        scaled = y_prob[:, idx] * levels if levels else None
+        votes = np.rint(scaled) if levels else None
+        # Scores on the 1 / levels grid are binned; any others are sorted.
+        if levels and np.allclose(votes, scaled, rtol=0, atol=1e-6):
+            fps, tps = _binned_counts(y_bin[:, idx], votes.astype(np.intp), levels)
+        else:
+            fps, tps = _cumulative_counts(y_bin[:, idx], y_prob[:, idx])
+
+        # ROC keeps only the corners of the curve, like drop_intermediate=True.
+        roc_fps, roc_tps = fps, tps
+        if fps.size > 2:
+            keep = np.flatnonzero(np.r_[True, np.logical_or(np.diff(fps, 2), np.diff(tps, 2)), True])
+            roc_fps, roc_tps = fps[keep], tps[keep]
+        roc_fps = np.r_[0, roc_fps]
+        roc_tps = np.r_[0, roc_tps]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fpr = roc_fps / roc_fps[-1]
+            tpr = roc_tps / roc_tps[-1]
         roc_map[label] = {
-            "fpr": _downsample(fpr.tolist()),
-            "tpr": _downsample(tpr.tolist()),
-            "auc": float(auc(fpr, tpr)),
+            "fpr": _downsample(fpr),
+            "tpr": _downsample(tpr),
+            "auc": auc(fpr, tpr),
         }
-    return roc_map
-
 
-def pr_data(y_true, y_prob, classes: List[str]) -> Dict[str, dict]:
-    y_bin = label_binarize(y_true, classes=classes)
-    pr_map: Dict[str, dict] = {}
-    for idx, label in enumerate(classes):
-        precision, recall, _ = precision_recall_curve(y_bin[:, idx], y_prob[:, idx])
+        predicted = tps + fps
+        precision = np.divide(tps, predicted, out=np.zeros(tps.size), where=predicted != 0)
+        recall = tps / tps[-1] if tps[-1] else np.ones(tps.size)
         pr_map[label] = {
-            "precision": _downsample(precision.tolist()),
-            "recall": _downsample(recall.tolist()),
+            "precision": _downsample(np.r_[precision[::-1], 1]),
+            "recall": _downsample(np.r_[recall[::-1], 0]),
         }
-    return pr_map
+    return roc_map, pr_map
 
 
-def train_model(
-    data_path: Path,
-    model_path: Path,
-    metrics_path: Path,
-    algo: str = "logistic",
-) -> dict:
+def _prepare_splits(data_path: Path):
     df = build_dataset(data_path)
     df = add_derived_features(df)
-    X = df[FEATURES]
-    y = df["outcome"]
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    y = df["outcome"].cat.codes.to_numpy()
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.25, random_state=42, stratify=y
-    )
+    # The same draw train_test_split(..., stratify=y) makes, taken as indices.
+    sss = StratifiedShuffleSplit(n_splits=1, test_size=0.25, random_state=42)
+    train_idx, test_idx = next(sss.split(np.zeros(len(y)), y))
+    splits = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+    return splits, len(df)
+
+
+def _fit_and_score(splits, rows: int, model_path: Path, algo: str) -> dict:
+    X_train, X_test, y_train, y_test = splits
 
     preprocessor = build_preprocessor(algo)
-    model = build_model(algo)
+    model = build_model(algo, rows=len(X_train))
 
-    pipeline = Pipeline([
-        ("prep", preprocessor),
-        ("clf", model),
-    ])
+    steps = [("clf", model)]
+    if preprocessor is not None:
+        steps.insert(0, ("prep", preprocessor))
+    pipeline = Pipeline(steps)
 
     pipeline.fit(X_train, y_train)
-    preds = pipeline.predict(X_test)
     probs = pipeline.predict_proba(X_test)
-    classes = pipeline.classes_.tolist()
+    labels = pipeline.classes_
+    # Same as pipeline.predict for these classifiers, without a second pass.
+    preds = labels[probs.argmax(axis=1)]
+    # Models are fitted on outcome codes; names are only needed for the report.
+    classes = [OUTCOMES[code] for code in labels.tolist()]
 
+    cm = confusion_matrix(y_test, preds, labels=labels)
     metrics = {
-        "accuracy": float(accuracy_score(y_test, preds)),
-        "f1_weighted": float(f1_score(y_test, preds, average="weighted")),
-        "log_loss": float(log_loss(y_test, probs, labels=pipeline.classes_)),
+        "accuracy": np.trace(cm) / cm.sum(),
+        "f1_weighted": _f1_weighted(cm),
+        "log_loss": log_loss(y_test, probs, labels=labels),
         "classes": classes,
-        "rows": int(len(df)),
+        "rows": rows,
         "model": algo,
-        "confusion_matrix": confusion_matrix(y_test, preds, labels=classes).tolist(),
-        "roc": roc_data(y_test, probs, classes),
-        "pr": pr_data(y_test, probs, classes),
+        "confusion_matrix": cm.tolist(),
     }
+    y_bin = label_binarize(y_test, classes=labels)
+    levels = getattr(pipeline.named_steps["clf"], "n_estimators", None)
+    metrics["roc"], metrics["pr"] = curve_data(y_bin, probs, classes, levels=levels)
 
     feature_importance = feature_importance_map(pipeline.named_steps["clf"], FEATURES)
     metrics["feature_importance"] = feature_importance
 
     model_path.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(pipeline, model_path)
-    metrics_path.write_text(json.dumps(metrics, indent=2))
+    # Uncompressed so service.read_model can mmap it.
+    tmp_path = model_path.with_name(f"{model_path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    try:
+        joblib.dump(pipeline, tmp_path, compress=0, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, model_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
     return metrics
 
 
+def write_report(path: Path, payload: dict) -> None:
+    # NumPy scalars are serialized directly; curve arrays are already lists
+    # because the same dicts are returned through the API.
+    path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+
+
+def train_model(
+    data_path: Path,
+    model_path: Path,
+    metrics_path: Path,
+    algo: str = "logistic",
+) -> dict:
+    splits, rows = _prepare_splits(data_path)
+    metrics = _fit_and_score(splits, rows, model_path, algo)
+    write_report(metrics_path, metrics)
+    return metrics
+
+
 def train_compare(
     data_path: Path,
     out_path: Path,
     logistic_path: Path,
     rf_path: Path,
 ) -> dict:
-    metrics_logistic = train_model(data_path, logistic_path, out_path, algo="logistic")
-    metrics_rf = train_model(data_path, rf_path, out_path, algo="rf")
-
+    # Both algorithms are scored on the same split, prepared once.
+    splits, rows = _prepare_splits(data_path)
     compare = {
-        "logistic": metrics_logistic,
-        "rf": metrics_rf,
+        "logistic": _fit_and_score(splits, rows, logistic_path, "logistic"),
+        "rf": _fit_and_score(splits, rows, rf_path, "rf"),
     }
-    out_path.write_text(json.dumps(compare, indent=2))
+    write_report(out_path, compare)
     return compare